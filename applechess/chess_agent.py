@@ -13,13 +13,57 @@ Classes:
 Dependencies:
     chess (formerly python-chess): A chess library for Python, which provides move generation, validation, and more.
 """
-import os
-
-import random
+from collections import OrderedDict
+from contextlib import nullcontext
 from enum import Enum
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
 
 import chess
+import chess.polyglot
+
+# half-width of the aspiration window around the previous iteration's score, in heuristic units (about a pawn)
+_ASPIRATION_WINDOW = 0.5
+
+# depth reduction of the search after a null move, and width of the window it is searched with
+_NULL_MOVE_REDUCTION = 2
+_NULL_WINDOW = 0.01
+
+# minimum depth of an iteration for its root moves to be searched in parallel; shallower iterations finish faster
+# than the worker processes are handed the moves
+_PARALLEL_MIN_DEPTH = 4
+
+# bitboard masks of the A through H files
+_FILE_MASKS = (chess.BB_FILE_A, chess.BB_FILE_B, chess.BB_FILE_C, chess.BB_FILE_D,
+               chess.BB_FILE_E, chess.BB_FILE_F, chess.BB_FILE_G, chess.BB_FILE_H)
+
+# squares the king is rewarded for standing on after castling
+_WHITE_CASTLED_KING = (chess.G1, chess.C1, chess.B1)
+_BLACK_CASTLED_KING = (chess.G8, chess.C8, chess.B8)
+
+# center squares, rewarded for occupying or attacking
+_CENTER = (chess.E4, chess.E5, chess.D4, chess.D5)
+
+# initial squares of the bishops and knights
+_WHITE_MINOR_HOME = chess.BB_B1 | chess.BB_G1 | chess.BB_C1 | chess.BB_F1
+_BLACK_MINOR_HOME = chess.BB_B8 | chess.BB_G8 | chess.BB_C8 | chess.BB_F8
+
+# two back ranks, which the queen is rewarded for staying on in the opening
+_WHITE_BACK_TWO = chess.BB_RANK_1 | chess.BB_RANK_2
+_BLACK_BACK_TWO = chess.BB_RANK_7 | chess.BB_RANK_8
+
+# number of plies (half-moves) from the start of the game that are evaluated as the opening
+_OPENING_PLIES = 12
+
+# point value of each piece, indexed by piece type (the king has no meaningful value)
+_PIECE_VALUES = (0, 1, 3, 3, 5, 9, 0)
+
+# maximum number of evaluations kept in the evaluation cache before the least recently used are evicted
+_EVAL_CACHE_SIZE = 1 << 16
+
+# default of the outcome parameter of the heuristic when the caller has not computed it, since None means the game
+# has not ended
+_OUTCOME_UNSET = object()
 
 
 class ChessAgent:
@@ -36,6 +80,15 @@ class ChessAgent:
             self.board = chess.Board(fen=board)
         else:
             self.board = board
+        # transposition table mapping Zobrist keys to (depth, value, flag, best move) of previously searched nodes
+        self._tt: dict[int, tuple[int, float, ChessAgent.TTFlag, chess.Move | None]] = {}
+        # up to two quiet moves per ply that caused a cutoff, tried early in sibling nodes
+        self._killers: list[list[chess.Move]] = []
+        # heuristic values of previously evaluated positions, keyed on the board's transposition key (the piece
+        # bitboards, turn, castling rights and en passant square), the color, and whether the position is evaluated
+        # as the opening (which depends on the move history rather than the position). The transposition key is
+        # used instead of the Zobrist hash since the latter costs several times more than evaluating the position
+        self._eval_cache: OrderedDict[tuple[tuple, chess.Color, bool], float] = OrderedDict()
 
     class GamePhase(Enum):
         """
@@ -48,97 +101,134 @@ class ChessAgent:
         MIDGAME = 2
         ENDGAME = 3
 
+    class TTFlag(Enum):
+        """
+        Enum class to represent the kind of score stored in the transposition table.
+        Exact is a score that was searched with a full window.
+        Lower is a lower bound (the search failed high), upper is an upper bound (the search failed low).
+        """
+        EXACT = 1
+        LOWER = 2
+        UPPER = 3
+
     @staticmethod
     def get_value(piece: chess.Piece) -> int:
         """
-        Get the value of a piece based on the piece type. If an unknown piece is passed, 0 is returned.
+        Get the value of a piece based on the piece type. The king has no value, so 0 is returned for it.
         :param piece: the piece to get the value of.
         :return: the value of the piece.
         """
-        match piece.piece_type:
-            case chess.BISHOP:
-                return 3
-            case chess.KNIGHT:
-                return 3
-            case chess.QUEEN:
-                return 9
-            case chess.ROOK:
-                return 5
-            case chess.PAWN:
-                return 1
-            case _:
-                # unknown piece (probably king), return 0 because it doesn't really mean anything
-                return 0
+        return _PIECE_VALUES[piece.piece_type]
 
     @staticmethod
     def __pawns_per_column(board: chess.Board, color: chess.Color) -> list[int]:
-        pawns_per_column = [0, 0, 0, 0, 0, 0, 0, 0]
-        pawns = board.pieces(chess.PAWN, color)
-        for pawn in pawns:
-            if pawn % 8 == 0:    # A file
-                pawns_per_column[0] += 1
-            elif pawn % 8 == 1:  # B file
-                pawns_per_column[1] += 1
-            elif pawn % 8 == 2:  # C file
-                pawns_per_column[2] += 1
-            elif pawn % 8 == 3:  # D file
-                pawns_per_column[3] += 1
-            elif pawn % 8 == 4:  # E file
-                pawns_per_column[4] += 1
-            elif pawn % 8 == 5:  # F file
-                pawns_per_column[5] += 1
-            elif pawn % 8 == 6:  # G file
-                pawns_per_column[6] += 1
-            elif pawn % 8 == 7:  # H file
-                pawns_per_column[7] += 1
-        return pawns_per_column
-
-    def _get_heuristic(self, board: chess.Board, color: chess.Color) -> float:
-        """
-        Get the heuristic value of a board state for a given color, using various factors such as material,
+        pawns = board.pawns & board.occupied_co[color]
+        return [(pawns & file_mask).bit_count() for file_mask in _FILE_MASKS]
+
+    @staticmethod
+    def _material_balance(board: chess.Board, color: chess.Color) -> int:
+        """
+        Get the point value of a color's material minus its opponent's, counted directly from the piece bitboards.
+        Each piece bitboard is read once for both colors.
+        :param board: the board to count the material of.
+        :param color: color to count the material for.
+        :return: the difference in point value of the material.
+        """
+        own = board.occupied_co[color]
+        opponent = board.occupied_co[not color]
+        pawns, knights, bishops, rooks, queens = board.pawns, board.knights, board.bishops, board.rooks, board.queens
+        return ((pawns & own).bit_count() - (pawns & opponent).bit_count()
+                + 3 * ((knights & own).bit_count() - (knights & opponent).bit_count())
+                + 3 * ((bishops & own).bit_count() - (bishops & opponent).bit_count())
+                + 5 * ((rooks & own).bit_count() - (rooks & opponent).bit_count())
+                + 9 * ((queens & own).bit_count() - (queens & opponent).bit_count()))
+
+    def _get_heuristic(
+            self,
+            board: chess.Board,
+            color: chess.Color,
+            outcome: chess.Outcome | None | object = _OUTCOME_UNSET
+    ) -> float:
+        """
+        Get the heuristic value of a board state for a given color, reusing the value from the evaluation cache
+        if the position was evaluated before.
+        :param board: the board to get the heuristic value of.
+        :param color: color to get the heuristic value for.
+        :param outcome: the outcome of the board as returned by board.outcome(), or None if the game has not ended.
+        If not given, it is computed from the board.
+        :return: the heuristic value of the board state for the given color.
+        """
+        if outcome is _OUTCOME_UNSET:
+            outcome = board.outcome()
+        if outcome is None and (board.halfmove_clock >= 100 or board.is_repetition(2)):
+            # a draw could be claimed (or forced by repeating once more); this depends on the move history,
+            # so it is checked before the cache
+            return 0.5
+        if outcome is not None:
+            # the game ended, possibly by a draw that depends on the move history; the score is a constant anyway
+            return self._evaluate(board, color, outcome)
+
+        key = (board._transposition_key(), color, len(board.move_stack) < _OPENING_PLIES)
+        score = self._eval_cache.get(key)
+        if score is None:
+            score = self._evaluate(board, color, outcome)
+            if len(self._eval_cache) >= _EVAL_CACHE_SIZE:
+                # evict the least recently used entry
+                self._eval_cache.popitem(last=False)
+            self._eval_cache[key] = score
+        else:
+            self._eval_cache.move_to_end(key)
+        return score
+
+    def _evaluate(self, board: chess.Board, color: chess.Color, outcome: chess.Outcome | None) -> float:
+        """
+        Compute the heuristic value of a board state for a given color, using various factors such as material,
         game phase, pawn structure, etc.
         :param board: the board to get the heuristic value of.
         :param color: color to get the heuristic value for.
+        :param outcome: the outcome of the board as returned by board.outcome(), or None if the game has not ended.
+        If not given, it is computed from the board.
         :return: the heuristic value of the board state for the given color.
         """
+        if outcome is _OUTCOME_UNSET:
+            outcome = board.outcome()
         score = 0
-        outcome = board.outcome()
 
         if outcome is None:
-            if board.can_claim_draw():
-                return 0.5
             # game has not ended yet
-            if len(board.move_stack) < 12:
+            if len(board.move_stack) < _OPENING_PLIES:
                 # if less than 6 moves have been played, it is probably the opening
                 game_phase = self.GamePhase.OPENING
-            elif len(board.piece_map()) < 13:
+            elif chess.popcount(board.occupied) < 13:
                 # if there are less than 11 pieces on the board, it is probably the endgame
                 game_phase = self.GamePhase.ENDGAME
             else:
                 game_phase = self.GamePhase.MIDGAME
 
+            pawns_per_column = self.__pawns_per_column(board, color)
+            opponent_pawns_per_column = self.__pawns_per_column(board, not color)
+
             if game_phase in (self.GamePhase.OPENING, self.GamePhase.MIDGAME):
                 # reward good king position
                 king_square = board.king(color)
                 if color == chess.WHITE:
-                    if king_square in (chess.G1, chess.C1, chess.B1):
+                    if king_square in _WHITE_CASTLED_KING:
                         score += 0.1
                 else:
-                    if king_square in (chess.G8, chess.C8, chess.B8):
+                    if king_square in _BLACK_CASTLED_KING:
                         score += 0.1
 
                 # reward control of the center
-                center_squares = [chess.E4, chess.E5, chess.D4, chess.D5]
-                for square in center_squares:
-                    if board.piece_at(square) is None:
-                        num_attackers = len(board.attackers(color, square))
+                for square in _CENTER:
+                    square_mask = chess.BB_SQUARES[square]
+                    if not board.occupied & square_mask:
+                        num_attackers = board.attackers_mask(color, square).bit_count()
                         score += 0.15 * num_attackers
-                    elif board.piece_at(square).color == color:
+                    elif board.occupied_co[color] & square_mask:
                         score += 0.4
-                    elif board.piece_at(square).color != color:
+                    else:
                         score -= 0.4
 
-                pawns_per_column = self.__pawns_per_column(board, color)
                 # punish double pawns
                 for pawns in pawns_per_column:
                     if pawns > 1:
@@ -148,29 +238,23 @@ class ChessAgent:
                 # reward bishop/knight development
                 # initial squares for bishops and knights based on color
                 if color == chess.WHITE:
-                    initial_squares = [chess.B1, chess.G1, chess.C1, chess.F1]
+                    initial_squares = _WHITE_MINOR_HOME
                 else:
-                    initial_squares = [chess.B8, chess.G8, chess.C8, chess.F8]
-                for square in initial_squares:
-                    piece = board.piece_at(square)
-                    if piece is not None and piece.color == color and (
-                            piece.piece_type in (chess.BISHOP, chess.KNIGHT)):
-                        # was not developed
-                        score -= 0.1
+                    initial_squares = _BLACK_MINOR_HOME
+                # each own bishop or knight still on an initial square was not developed
+                undeveloped = (board.bishops | board.knights) & board.occupied_co[color] & initial_squares
+                score -= 0.1 * undeveloped.bit_count()
 
                 # penalize excessive queen movement
-                queen = board.pieces(chess.QUEEN, color)
+                queen = board.queens & board.occupied_co[color]
                 if color == chess.WHITE:
-                    squares = chess.SquareSet(chess.BB_RANK_1 | chess.BB_RANK_2)
+                    squares = _WHITE_BACK_TWO
                 else:
-                    squares = chess.SquareSet(chess.BB_RANK_7 | chess.BB_RANK_8)
-                if len(queen) == 1 and list(queen)[0] in squares:
+                    squares = _BLACK_BACK_TWO
+                if queen.bit_count() == 1 and queen & squares:
                     score += 0.15
 
             elif game_phase == self.GamePhase.MIDGAME:
-                pawns_per_column = self.__pawns_per_column(board, color)
-                opponent_pawns_per_column = self.__pawns_per_column(board, not color)
-
                 # reward passed pawns
                 for i, pawns in enumerate(pawns_per_column):
                     if pawns > 0 and opponent_pawns_per_column[i] == 0:
@@ -192,9 +276,6 @@ class ChessAgent:
                         score -= 0.2
 
             elif game_phase == self.GamePhase.ENDGAME:
-                pawns_per_column = self.__pawns_per_column(board, color)
-                opponent_pawns_per_column = self.__pawns_per_column(board, not color)
-
                 # reward passed pawns
                 for i, pawns in enumerate(pawns_per_column):
                     if pawns > 0 and opponent_pawns_per_column[i] == 0:
@@ -204,23 +285,13 @@ class ChessAgent:
                     if pawns > 0 and pawns_per_column[i] == 0:
                         score -= 1
 
-                # reward king activity
-                for move in board.legal_moves:
-                    if board.piece_at(move.from_square).piece_type == chess.KING:
-                        score += 0.1
-
-            # point value of material for both players
-            agent_material = 0
-            opponent_material = 0
-
-            for _sq, piece in board.piece_map().items():
-                if piece.color == color:
-                    agent_material += self.get_value(piece)
-                else:
-                    opponent_material += self.get_value(piece)
+                # reward king activity, counted as the squares around the king not blocked by own pieces
+                king_square = board.king(color)
+                if king_square is not None:
+                    score += 0.1 * (chess.BB_KING_ATTACKS[king_square] & ~board.occupied_co[color]).bit_count()
 
             # reward difference of material
-            diff_material = agent_material - opponent_material
+            diff_material = self._material_balance(board, color)
             if game_phase == self.GamePhase.OPENING:
                 score += diff_material
             elif game_phase == self.GamePhase.MIDGAME:
@@ -252,122 +323,302 @@ class ChessAgent:
         new_board.push(move)
         return new_board
 
-    def get_ordered_legal_moves(self, board: chess.Board) -> list[chess.Move]:
+    @staticmethod
+    def _mvv_lva(board: chess.Board, move: chess.Move) -> int:
+        """
+        Score a capture by the MVV-LVA heuristic (most valuable victim, least valuable attacker).
+        :param board: the board the capture is played on.
+        :param move: the capture to score.
+        :return: the value of the captured piece minus the value of the capturing piece.
+        """
+        if board.is_en_passant(move):
+            # the captured pawn is not on the destination square
+            victim_value = _PIECE_VALUES[chess.PAWN]
+        else:
+            victim_value = _PIECE_VALUES[board.piece_type_at(move.to_square)]
+        attacker_value = _PIECE_VALUES[board.piece_type_at(move.from_square)]
+        return victim_value - attacker_value
+
+    def get_ordered_legal_moves(
+            self,
+            board: chess.Board,
+            ply: int = 0,
+            tt_move: chess.Move | None = None
+    ) -> Iterator[chess.Move]:
         """
         Get the legal moves of a board, ordered by the agent's preference for faster pruning.
-        This function utilizes the MVV-LVA heuristic.
+        The best move from the transposition table is yielded first, before the other moves are generated,
+        so that a cutoff on it skips generating them. Then the killer moves of the ply are yielded,
+        then the remaining moves ordered by the MVV-LVA heuristic.
         :param board: the board to get the legal moves of.
-        :return: the ordered legal moves.
+        :param ply: distance of the board from the root of the search, used to look up killer moves.
+        :param tt_move: best move previously found for this board in the transposition table, if any.
+        :return: a generator of the ordered legal moves.
         """
-        moves = board.legal_moves
+        if tt_move is not None and board.is_legal(tt_move):
+            yield tt_move
+
+        killers = self._killers[ply] if ply < len(self._killers) else []
         sorted_moves = []
 
-        for move in moves:
-            if board.is_capture(move):
-                try:
-                    victim_value = self.get_value(board.piece_at(move.to_square))
-                    attacker_value = self.get_value(board.piece_at(move.from_square))
-                    score = victim_value - attacker_value
-                except AttributeError:
-                    score = 10
+        for move in board.generate_legal_moves():
+            if move == tt_move:
+                continue
+            if move in killers:
+                score = 100 - killers.index(move)
+            elif board.is_capture(move):
+                score = self._mvv_lva(board, move)
             else:
                 score = -10
 
             if move.promotion is not None:
                 score += 50
-            if board.is_into_check(move):
-                score += 5
             sorted_moves.append((score, move))
 
         sorted_moves.sort(key=lambda x: x[0], reverse=True)
-        return [move for _, move in sorted_moves]
+        for _, move in sorted_moves:
+            yield move
+
+    def _store_killer(self, board: chess.Board, move: chess.Move, ply: int) -> None:
+        """
+        Remember a quiet move that caused a cutoff so that it is tried early in other nodes at the same ply.
+        :param board: the board the move was played on.
+        :param move: the move that caused the cutoff.
+        :param ply: distance of the board from the root of the search.
+        """
+        if board.is_capture(move):
+            # captures are already ordered early by MVV-LVA
+            return
+        while len(self._killers) <= ply:
+            self._killers.append([])
+        killers = self._killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+
+    def _quiesce(
+            self,
+            node: chess.Board,
+            color: chess.Color,
+            a: float,
+            b: float,
+            outcome: chess.Outcome | None
+    ) -> float:
+        """
+        Quiescence search, in negamax form, run at the leaves of the alpha-beta search.
+        Only captures are searched, until the position is quiet, so that a position in the middle of an exchange
+        is not evaluated as if it were stable.
+        :param node: the board state to evaluate.
+        :param color: the color the heuristic is evaluated for, i.e. the agent's color.
+        :param a: alpha value.
+        :param b: beta value.
+        :param outcome: the outcome of the board as returned by board.outcome(), or None if the game has not ended.
+        :return: the score of the board for the side to move.
+        """
+        stand_pat = self._get_heuristic(node, color, outcome)
+        if node.turn != color:
+            stand_pat = -stand_pat
+        # the side to move may also decline every capture, so the static score is a lower bound
+        if outcome is not None or stand_pat >= b:
+            return stand_pat
+        a = max(a, stand_pat)
+
+        captures = sorted(node.generate_legal_captures(), key=lambda move: self._mvv_lva(node, move), reverse=True)
+        value = stand_pat
+        for move in captures:
+            node.push(move)
+            score = -self._quiesce(node, color, -b, -a, node.outcome())
+            node.pop()
+            if score > value:
+                value = score
+                a = max(a, value)
+                if a >= b:
+                    break
+        return value
+
+    def _store_tt(self, key: int, depth: int, value: float, a: float, b: float, best_move: chess.Move | None) -> None:
+        """
+        Store the result of a search in the transposition table, flagged by how it relates to the search window.
+        An entry from a deeper search of the same board is kept rather than replaced by a shallower one.
+        :param key: Zobrist key of the searched board.
+        :param depth: depth the board was searched to.
+        :param value: the score found by the search.
+        :param a: alpha value the board was searched with.
+        :param b: beta value the board was searched with.
+        :param best_move: the best move found by the search, if any.
+        """
+        entry = self._tt.get(key)
+        if entry is not None and entry[0] > depth:
+            return
+        if value <= a:
+            flag = self.TTFlag.UPPER
+        elif value >= b:
+            flag = self.TTFlag.LOWER
+        else:
+            flag = self.TTFlag.EXACT
+        self._tt[key] = (depth, value, flag, best_move)
 
     def _alphabeta(
             self,
             node: chess.Board,
             depth: int,
             color: chess.Color,
-            maximizing_player: bool,
             a: float = float("-inf"),
             b: float = float("inf"),
-            parallelize: bool = True
+            ply: int = 0,
+            pv: bool = True
     ) -> float:
         """
-        Alpha-beta pruning algorithm to find the best move for a given board state.
+        Alpha-beta pruning algorithm, in negamax form, to find the score of the best move for a given board state.
+        Scores are relative to the side to move in the node, so the score of a child is negated (along with the
+        alpha-beta window) to get its score for the parent.
         :param node: the board state to find the best move for.
         :param depth: the depth of the search tree.
+        :param color: the color the heuristic is evaluated for, i.e. the agent's color.
+        :param a: alpha value.
+        :param b: beta value.
+        :param ply: distance of the node from the root of the search.
+        :param pv: whether the node is on the principal variation, i.e. reached through the first move searched at
+        every ply above it. Only nodes off the principal variation are pruned with a null move.
+        :return: the score of the best move for the side to move.
+        """
+        if depth == 0:
+            return self._quiesce(node, color, a, b, node.outcome())
+
+        # reuse the result of a previous search of the same position if it was at least as deep
+        key = chess.polyglot.zobrist_hash(node)
+        a_orig = a
+        entry = self._tt.get(key)
+        tt_move = entry[3] if entry is not None else None
+        if entry is not None and entry[0] >= depth:
+            _, tt_value, tt_flag, _ = entry
+            if tt_flag == self.TTFlag.EXACT:
+                return tt_value
+            if tt_flag == self.TTFlag.LOWER:
+                a = max(a, tt_value)
+            else:
+                b = min(b, tt_value)
+            if a >= b:
+                return tt_value
+
+        # terminal node; checked after probing the table, since outcome() runs move generation
+        outcome = node.outcome()
+        if outcome is not None:
+            score = self._get_heuristic(node, color, outcome)
+            return score if node.turn == color else -score
+
+        # null-move pruning: if passing the turn still fails high, a real move will too (barring zugzwang, which is
+        # unlikely while the side to move has pieces besides pawns). Beta is returned rather than the null-move
+        # score, since a mate score found after passing the turn is not proven for the real moves
+        if (depth > _NULL_MOVE_REDUCTION and not pv and not node.is_check()
+                and node.peek() and node.occupied_co[node.turn] & ~(node.pawns | node.kings)):
+            node.push(chess.Move.null())
+            null_value = -self._alphabeta(node, depth - 1 - _NULL_MOVE_REDUCTION, color, -b, -b + _NULL_WINDOW,
+                                          ply + 1, False)
+            node.pop()
+            if null_value >= b:
+                return b
+
+        value = float("-inf")
+        best_move = None
+        for move in self.get_ordered_legal_moves(node, ply, tt_move):
+            node.push(move)
+            # only the first move of a principal variation node leads to another one
+            score = -self._alphabeta(node, depth - 1, color, -b, -a, ply + 1, pv and best_move is None)
+            node.pop()
+            if score > value:
+                value = score
+                best_move = move
+            a = max(a, value)
+            if a >= b:
+                self._store_killer(node, move, ply)
+                break
+
+        # beta may have been lowered by an upper bound from the table, a score reaching it is still only a lower bound
+        self._store_tt(key, depth, value, a_orig, b, best_move)
+        return value
+
+    def _search_root(
+            self,
+            depth: int,
+            color: chess.Color,
+            a: float,
+            b: float,
+            executor: Executor | None = None
+    ) -> tuple[float, chess.Move]:
+        """
+        Search the legal moves of the board to a given depth within an alpha-beta window.
+        The best score found so far is used as the alpha value of the following moves, so they are only searched
+        as far as needed to show that they are not better.
+        If an executor is given, only the first move is searched in this process, to establish the alpha value,
+        and the remaining moves are searched in parallel with it (Young Brothers Wait).
+        :param depth: depth of the search tree, counting the root move.
         :param color: the color to find the best move for.
-        :param maximizing_player: the player to maximize the score for. If True, it is the agent's turn.
-        Otherwise, it is the opponent's turn.
         :param a: alpha value.
         :param b: beta value.
-        :param parallelize: whether to parallelize the search.
-        :return: the score of the best move.
+        :param executor: process pool to search the moves after the first in, or None to search serially. Its workers
+        must have been initialized with _init_worker at the current board.
+        :return: the best score and the first move that reached it.
         """
-        # depth is zero or it is a terminal node
-        if depth == 0 or node.outcome() is not None:
-            return self._get_heuristic(node, color)
-
-        if parallelize:
-            with ThreadPoolExecutor(max_workers=os.cpu_count() * 2) as executor:
-                futures = []
-                for move in self.get_ordered_legal_moves(node):
-                    child = self.play_move(node, move)
-                    futures.append(executor.submit(self._alphabeta, child, depth - 1,
-                                                   color, not maximizing_player, a, b, False))
-
-                values = [future.result() for future in as_completed(futures)]
-                if maximizing_player:
-                    return max(values)
-                return min(values)
-        else:
-            if maximizing_player:
-                value = float("-inf")
-                for move in self.get_ordered_legal_moves(node):
-                    child = self.play_move(node, move)
-                    value = max(value, self._alphabeta(child, depth - 1, color, False, a, b, False))
-                    a = max(a, value)
-                    if value > b:
-                        break
-                return value
-
-            value = float("inf")
-            for move in self.get_ordered_legal_moves(node):
-                child = self.play_move(node, move)
-                value = min(value, self._alphabeta(child, depth - 1, color, True, a, b, False))
-                b = min(b, value)
-                if value <= a:
+        # the best move of the previous iteration is searched first
+        key = chess.polyglot.zobrist_hash(self.board)
+        entry = self._tt.get(key)
+        tt_move = entry[3] if entry is not None else None
+
+        best_score = float("-inf")
+        best_move = None
+        moves = self.get_ordered_legal_moves(self.board, 0, tt_move)
+        for move in moves:
+            self.board.push(move)
+            score = -self._alphabeta(self.board, depth - 1, color, -b, -max(a, best_score), 1, best_move is None)
+            self.board.pop()
+            if score > best_score:
+                best_score, best_move = score, move
+                if best_score >= b:
                     break
-            return value
+            if executor is not None:
+                break
+
+        if executor is not None and best_score < b:
+            futures = [(executor.submit(_search_move, move.uci(), depth, color, max(a, best_score), b), move)
+                       for move in moves]
+            # results are read in move order, so that the first move reaching the best score is kept
+            for future, move in futures:
+                score = future.result()
+                if score > best_score:
+                    best_score, best_move = score, move
+
+        self._store_tt(key, depth, best_score, a, b, best_move)
+        return best_score, best_move
 
     def get_best_move(self, depth: int, parallelize: bool = False) -> chess.Move:
         """
         Agent that plays a move based on the alpha/beta-minimax algorithm.
+        The search is iteratively deepened, so that each iteration fills the transposition table used to order
+        the moves of the next one, and each iteration after the first uses an aspiration window around the
+        previous score.
         :param depth: depth of the search tree.
-        :param parallelize: whether to parallelize the search.
+        :param parallelize: whether to search the root moves after the first in parallel, in separate processes,
+        in the iterations of at least _PARALLEL_MIN_DEPTH.
         :return: the best move to play.
         """
         color = self.board.turn
-        scores = {}
         if parallelize:
-            with ThreadPoolExecutor() as executor:
-                future_to_move = {}
-                for move in list(self.board.legal_moves):
-                    next_board = self.play_move(self.board, move)
-                    future_to_move = {executor.submit(self._alphabeta, next_board, depth - 1, color,
-                                                      False, float("-inf"), float("inf"), True): move}
-                for future in as_completed(future_to_move):
-                    move = future_to_move[future]
-                    score = future.result()
-                    scores[move] = score
-
+            # workers rebuild the board from the starting position and moves, since the history affects the heuristic
+            history = [move.uci() for move in self.board.move_stack]
+            pool = ProcessPoolExecutor(initializer=_init_worker, initargs=(self.board.root().fen(), history))
         else:
-            for move in list(self.board.legal_moves):
-                next_board = self.play_move(self.board, move)
-                scores[move] = self._alphabeta(next_board, depth - 1, color, False, True)
-
-        best_moves = [move for move in scores.keys() if scores[move] == max(scores.values())]
-        return random.choice(best_moves)
+            pool = nullcontext()
+        with pool as executor:
+            score, best_move = self._search_root(1, color, float("-inf"), float("inf"))
+            for d in range(2, depth + 1):
+                d_executor = executor if d >= _PARALLEL_MIN_DEPTH else None
+                a, b = score - _ASPIRATION_WINDOW, score + _ASPIRATION_WINDOW
+                score, best_move = self._search_root(d, color, a, b, d_executor)
+                if score <= a or score >= b:
+                    # the score fell outside the window, so the bounds are unreliable; search again with a full window
+                    score, best_move = self._search_root(d, color, float("-inf"), float("inf"), d_executor)
+        return best_move
 
     def pprint(self) -> None:
         """Pretty print the board."""
@@ -382,6 +633,9 @@ class ChessAgent:
             self.board.push_uci(move)
         except ValueError:
             self.board.push_san(move)
+        # cached scores are relative to the side to move at the root, which just changed
+        self._tt.clear()
+        self._killers.clear()
 
     def agent_gen_push_move(self, depth: int) -> chess.Move:
         """
@@ -390,6 +644,8 @@ class ChessAgent:
         """
         move = self.get_best_move(depth)
         self.board.push(move)
+        self._tt.clear()
+        self._killers.clear()
         return move
 
     def interactive_terminal(self, color: chess.Color = chess.WHITE, depth: int = 3) -> None:
@@ -417,3 +673,38 @@ class ChessAgent:
             print("You won!")
         else:
             print("You lost.")
+
+
+# agent of a worker process of a parallel search, set up at the root of the search by _init_worker, so that its
+# transposition table and killer moves are kept across the root moves and iterations of the search
+_worker_agent: ChessAgent | None = None
+
+
+def _init_worker(root_fen: str, moves: list[str]) -> None:
+    """
+    Set up the agent of a worker process of a parallel search.
+    :param root_fen: FEN of the starting position of the game.
+    :param moves: moves of the game in UCI format, up to the root of the search.
+    """
+    global _worker_agent
+    board = chess.Board(root_fen)
+    for move in moves:
+        board.push_uci(move)
+    _worker_agent = ChessAgent(board)
+
+
+def _search_move(move: str, depth: int, color: chess.Color, a: float, b: float) -> float:
+    """
+    Search a root move in a worker process of a parallel search.
+    :param move: the root move to search, in UCI format.
+    :param depth: depth of the search tree, counting the root move.
+    :param color: the color to find the best move for.
+    :param a: alpha value.
+    :param b: beta value.
+    :return: the score of the root move for the side to move at the root.
+    """
+    board = _worker_agent.board
+    board.push_uci(move)
+    score = -_worker_agent._alphabeta(board, depth - 1, color, -b, -a, 1, False)
+    board.pop()
+    return score